@@ -66,17 +66,20 @@ class Database:
             finally:
                 await session.close()
 
-    def create_engine(self, database_url: str) -> None:
+    def create_engine(self, database_url: str, **options) -> None:
         """Create an async engine and async sessionmaker as attributes.
 
            :param database_url: URL of an async database.
+           :param options: other keyword args for `create_async_engine`,
+                           e.g. `poolclass=StaticPool` for an in-memory database.
            :raises Exception: If the engine creation fails.
         """
         try:
             self.engine: AsyncEngine = create_async_engine(
                 database_url,
                 echo=False,   # Log SQL queries (useful for development)
-                future=True   # Use SQLAlchemy 2.0 style APIs
+                future=True,  # Use SQLAlchemy 2.0 style APIs
+                **options
             )
             # if that worked, set the database_url
             self.database_url = database_url
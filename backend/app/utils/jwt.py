@@ -3,9 +3,10 @@
 This module is independent of SqlAlchemy and Pydantic.
 """
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import logging
 from typing import Any
-from jose import jwt
+from jose import jwk, jwt
 import jose.exceptions
 from app.core.config import settings
 
@@ -15,6 +16,16 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 EXPIRY = "exp"
 
 
+@lru_cache(maxsize=8)
+def _signing_key(secret_key: str | bytes, algorithm: str) -> jwk.Key:
+    """Return a key object for signing and verifying tokens.
+
+    Key objects are cached, so jose doesn't construct a new key for every token.
+    The cache key includes the secret, so a changed `settings.secret_key` gets a new key.
+    """
+    return jwk.construct(secret_key, algorithm)
+
+
 def create_access_token(data: dict, expires: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
     """Create a JWT token containing the `data` dict as payload, with an expiry datetime.
 
@@ -28,7 +39,7 @@ def create_access_token(data: dict, expires: int = ACCESS_TOKEN_EXPIRE_MINUTES)
     expires = datetime.now(timezone.utc) + timedelta(minutes=expires)
     expire_timestamp = int(expires.timestamp())
     payload.update({EXPIRY: expire_timestamp})
-    encoded_jwt = jwt.encode(payload, SECRET_KEY, algorithm=JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(payload, _signing_key(SECRET_KEY, JWT_ALGORITHM), algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
 
@@ -43,7 +54,7 @@ def verify_access_token(token: str) -> dict[str, Any]:
     SECRET_KEY = settings.secret_key
     JWT_ALGORITHM = settings.jwt_algorithm
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, _signing_key(SECRET_KEY, JWT_ALGORITHM), algorithms=[JWT_ALGORITHM])
         # Check for required fields
         # user_id: str = payload.get("user_id")
         expiry = payload.get(EXPIRY)
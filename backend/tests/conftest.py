@@ -5,14 +5,28 @@
    2. pytest_sessionstart(session)
    Last. pytest_sessionfinish(session)
 
-   In my tests, the fixture annotated with @fixture(scope="session")
-   was never executed.
+   A fixture annotated with @fixture(scope="session") is executed only if
+   some test uses it, unless it is `autouse=True` like `database_engine` below.
+
+   Each test module runs in a database transaction (`connection` fixture)
+   and each test is rolled back to a savepoint (`savepoint` fixture).
 
    To verify that this file is found by pytest, use:  pytest --trace-config
+
+   Tests use an in-memory SQLite database.
+
+   To run tests in parallel processes using pytest-xdist, use:
+   pytest -n auto --dist loadfile
+   Each process has its own in-memory database. "--dist loadfile" runs all tests
+   in a module in the same process, so module-scoped fixtures are created only once.
 """
 from datetime import datetime
 import logging
 import os
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.core.database import db
 from app.core.config import settings
 
@@ -48,6 +62,23 @@ def pytest_configure(config):
     # Create a new secret_key to avoid exposing the env var value.
     # This assumes that the jwt functions use the key in settings.secret_key
     settings.secret_key = os.urandom(32)
+    # Sign tokens using HMAC in tests, even if JWT_ALGORITHM is set to a slow RSA algorithm.
+    settings.jwt_algorithm = "HS256"
+
+
+def enable_sqlite_savepoints(engine: AsyncEngine):
+    """Let SqlAlchemy emit BEGIN itself, so that SAVEPOINT works with the sqlite driver.
+
+       The sqlite3 driver otherwise begins and commits transactions on its own.
+       See "Serializable isolation / Savepoints / Transactional DDL" in the SqlAlchemy SQLite docs.
+    """
+    @event.listens_for(engine.sync_engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def do_begin(connection):
+        connection.exec_driver_sql("BEGIN")
 
 
 def pytest_sessionstart(session):
@@ -55,13 +86,60 @@ def pytest_sessionstart(session):
     event_log("Run pytest_sessionstart(session)")
     logging.getLogger(__name__).info("Run pytest_sessionstart(session)")
     # Connect to testing database
-    db.create_engine(TEST_DATABASE_URL)
+    # StaticPool shares one connection, hence the same in-memory database, among all sessions
+    db.create_engine(TEST_DATABASE_URL, poolclass=StaticPool)
+    enable_sqlite_savepoints(db.engine)
     logging.getLogger(__name__).info(f"db.engine.url = {db.engine.url}")
-    assert str(db.engine.url) == TEST_DATABASE_URL
-    # Destroy and recreate tables (one time)?
-    # -- See also the "session" fixture in fixtures.py
-    # asyncio.run(db.destroy_tables())
-    # asyncio.run(db.create_tables())
+
+
+@pytest_asyncio.fixture(scope="session", autouse=True)
+async def database_engine():
+    """Share the test database engine among all tests, and dispose it after the last test.
+
+       The engine is created in `pytest_sessionstart` so it is known when tests are collected.
+       The tables are created once here. Tests roll back their changes (see `connection`).
+       Disposing the engine closes the pooled connection(s) in the session event loop.
+    """
+    engine = db.engine
+    await db.create_tables()
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="module", autouse=True)
+async def connection():
+    """Run the tests in each module inside a database transaction that is rolled back at the end.
+
+       All sessions from db.async_sessionmaker, including sessions used by route handlers,
+       use this connection. Their commits only release a savepoint in this transaction.
+    """
+    async with db.engine.connect() as connection:
+        transaction = await connection.begin()
+        engine_sessionmaker = db.async_sessionmaker
+        db.async_sessionmaker = async_sessionmaker(
+            bind=connection,
+            join_transaction_mode="create_savepoint",
+            expire_on_commit=False,
+            autoflush=False,
+            class_=AsyncSession,
+        )
+        try:
+            yield connection
+        finally:
+            db.async_sessionmaker = engine_sessionmaker
+            await transaction.rollback()
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def savepoint(connection):
+    """Roll back database changes made by each test, so each test starts with the same data.
+
+       Data created by module-scoped fixtures (before the savepoint) is kept for the whole module.
+    """
+    savepoint = await connection.begin_nested()
+    yield savepoint
+    if savepoint.is_active:
+        await savepoint.rollback()
 
 
 def pytest_sessionfinish(session, exitstatus):
@@ -15,24 +15,22 @@
 
    Instead, do session-level initialization and teardown in conftest.py
 
-   Another BUG: pytest_asyncio.fixture does not honor the `scope=` parameter.
-   Problem:  You can't use a synchronous fixture as a fixture parameter
-             in an async fixture.
-   This doesn't work:
-   @pytest_asyncio.fixture(scope="session")
-   def myfixture(session):
+   Async fixtures may be module or session scoped, e.g. `auth_user` and `async_client`.
+   All tests and async fixtures run in one session event loop (asyncio_default_*_loop_scope
+   in setup.cfg), so a database connection or client made by a shared fixture works in every test.
 """
 # flake8: noqa: D401 First line should be in imperative mood
 
-from typing import Generator
 import pytest, pytest_asyncio
 import fastapi.testclient
+import httpx
 from app.core import security
 from app.core.database import db
 # Must import models so that db.create_tables() can create the table schema
 from app import main, models, schemas
 from app.data_access import user_dao
 from .conftest import TEST_DATABASE_URL
+from .utils import auth_header
 
 AUTH_USER_EMAIL = "admin@localhost.com"
 AUTH_USER_PASSWORD = "MakeMyDay"
@@ -41,13 +39,10 @@ AUTH_USER_PASSWORD = "MakeMyDay"
 @pytest_asyncio.fixture()
 async def session():
     """Test fixture that yields an AsyncSession for use in a test."""
-    # Create tables before each test?
     assert str(db.engine.url) == TEST_DATABASE_URL, \
            f"Are you using a test database? Got db URL {str(db.engine.url)}"
-    await db.destroy_tables()
-    await db.create_tables()
-    # Or delete data from tables? Should be faster and less I/O.
-    # await db.delete_all_data2(models.Base)
+    # Tables are created once per test session (conftest.database_engine).
+    # Changes are rolled back after each test (conftest.savepoint).
     try:
         async for session in db.get_session():
             yield session
@@ -55,54 +50,76 @@ async def session():
         await session.close()
 
 
-@pytest_asyncio.fixture()
-async def auth_user(session) -> models.User:
-    """Create a user for use in other tests."""
-    user = models.User(username="admin", email=AUTH_USER_EMAIL)
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
-    user_password = models.UserPassword(
-                        hashed_password=security.hash_password(AUTH_USER_PASSWORD),
-                        user_id=user.id
-                    )
-    session.add(user_password)
-    await session.commit()
+@pytest_asyncio.fixture(scope="module")
+async def auth_user(connection) -> models.User:
+    """Create a user for use in other tests.
+
+       The user is created once per module, before the savepoint of each test.
+       Hashing the password is slow, by design.
+    """
+    async for session in db.get_session():
+        user = models.User(username="admin", email=AUTH_USER_EMAIL)
+        session.add(user)
+        await session.commit()
+        user_password = models.UserPassword(
+                            hashed_password=security.hash_password(AUTH_USER_PASSWORD),
+                            user_id=user.id
+                        )
+        session.add(user_password)
+        await session.commit()
     return user
 
 
 @pytest.fixture()
+def auth_headers(auth_user) -> httpx.Headers:
+    """Authorization header with an access token for auth_user.
+
+       The token is created once and cached by auth_header. Each test gets its own
+       httpx.Headers, so a test cannot change the header used by other tests.
+       httpx copies an httpx.Headers for each request without parsing it again, as it does a dict.
+    """
+    return httpx.Headers(auth_header(auth_user))
+
+
+@pytest_asyncio.fixture(scope="session")
 async def async_client():
-    """Async test fixture for client, DOES NOT WORK as FastAPI test client.
+    """Async test client for calls to FastAPI route endpoints, shared by all tests.
 
-       Use the `client` fixture instead.
+       Requests are handled in the test's event loop, not in a separate thread like TestClient.
     """
-    from httpx import AsyncClient
-    async with AsyncClient(app=main.app) as client:
+    transport = httpx.ASGITransport(app=main.app)
+    # follow_redirects=True is the same as TestClient
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver",
+                                 follow_redirects=True) as client:
         yield client
 
 
-@pytest.fixture()
+@pytest.fixture(scope="session")
 def client(): # -> Generator[fastapi.testclient.TestClient]
-    """Test fixture for calls to FastAPI route endpoints."""
+    """Test fixture for calls to FastAPI route endpoints, shared by all tests."""
     # main.app.dependency_overrides[get_session] = db.get_session
     yield fastapi.testclient.TestClient(main.app)
 
 
-@pytest_asyncio.fixture()
-async def alexa(session):
-    """Test fixture for a user entity named Alexa."""
+@pytest_asyncio.fixture(scope="module")
+async def alexa(connection):
+    """Test fixture for a user entity named Alexa, created once per module.
+
+       Changes made by a test are rolled back, so the entity is the same in each test.
+    """
     new_user = schemas.UserCreate(email="alexa@amazon.com", username="Alexa")
-    user = await user_dao.create(session, new_user)
+    async for session in db.get_session():
+        user = await user_dao.create(session, new_user)
     assert user.id > 0, "Persisted user should have id > 0"
     return user
 
 
-@pytest_asyncio.fixture()
-async def sally(session):
-    """Test fixture for a user entity named Sally."""
+@pytest_asyncio.fixture(scope="module")
+async def sally(connection):
+    """Test fixture for a user entity named Sally, created once per module."""
     new_user = schemas.UserCreate(email="sally@yahoo.com", username="Sally")
-    user = await user_dao.create(session, new_user)
+    async for session in db.get_session():
+        user = await user_dao.create(session, new_user)
     assert user.id > 0, "Persisted user should have id > 0"
     return user
 
@@ -3,10 +3,8 @@ from datetime import datetime, timezone
 from fastapi import status
 from fastapi.testclient import TestClient
 
-import pytest
 from app import models, schemas
 from app.routers.base import path
-from app.utils import jwt
 # VS Code thinks these fixtures are unused, but they are used & necessary.
 # MUST import session fixture to force it to be executed, even if 'session' is not injected in any tests
 from .fixtures import session, alexa, sally, client
@@ -36,7 +34,7 @@ def test_create_data_source_as_authenticated(alexa: models.User, client: TestCli
                            headers=auth_header(alexa),
                            json=data)
     assert result.status_code == status.HTTP_201_CREATED
-    new_source = schemas.DataSource(**result.json())
+    new_source = schemas.DataSource.model_validate_json(result.content)
     assert new_source.id > 0
     assert new_source.name == data["name"]
     assert new_source.metrics == data["metrics"]
@@ -68,8 +66,7 @@ def test_create_data_source_always_owned_by_auth_user(alexa: models.User, sally,
                          headers=auth_header(alexa),
                          json=data)
     assert result.status_code == status.HTTP_201_CREATED
-    new_source = schemas.DataSource(**result.json())
-    assert new_source.owner_id == alexa.id
+    assert result.json()["owner_id"] == alexa.id
 
 
 def test_create_data_source_returns_location(client: TestClient, alexa: models.User):
@@ -95,7 +92,6 @@ def test_create_data_source_returns_location(client: TestClient, alexa: models.U
 def test_update_data_source_success(alexa: models.User, client: TestClient):
     """Authenticated user can update their own data source."""
     # Create a data source owned by Alexa
-    token = jwt.create_access_token(data={"user_id": alexa.id}, expires=30)
     data = {"name": "Original Name", "metrics": {"weight": "lb"}, "description": "Original description"}
     response = client.post(
         path("/sources/"),
@@ -145,8 +141,7 @@ def test_partial_update_preserves_old_data(alexa: models.User, client: TestClien
                     json=update_data
                     )
     assert response.status_code == status.HTTP_200_OK
-    updated = response.json()
-    updated_ds = schemas.DataSource(**response.json())
+    updated_ds = schemas.DataSource.model_validate_json(response.content)
     assert updated_ds.name == update_data["name"]
     assert updated_ds.metrics == update_data["metrics"]
     assert updated_ds.metrics["dia"] == "mmHg"
@@ -32,17 +32,25 @@ def test_create_engine():
     """We can change the database engine, database connection, and session maker."""
     from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
     database_url = "sqlite+aiosqlite:///:memory:"  # in-memory SQLite database
-    db.create_engine(database_url)
-    print("New database engine is", type(db.engine))
-    print("New database URL is", db.engine.url)
-    assert db.database_url == database_url
-    # strings look same, but are not the same object
-    assert str(db.engine.url) == database_url
-    assert isinstance(db.engine, AsyncEngine)
-    session = db.get_session()
-    print("db.get_session returned", type(session))
-    assert not isinstance(session, AsyncSession), "session is not an AsyncSession"
-    assert isinstance(session, AsyncGenerator), "session is not an AsyncGenerator"
+    # The test database and its tables are shared by all tests, so restore them afterwards
+    old_engine, old_sessionmaker, old_url = db.engine, db.async_sessionmaker, db.database_url
+    try:
+        db.create_engine(database_url)
+        print("New database engine is", type(db.engine))
+        print("New database URL is", db.engine.url)
+        assert db.database_url == database_url
+        # strings look same, but are not the same object
+        assert str(db.engine.url) == database_url
+        assert isinstance(db.engine, AsyncEngine)
+        session = db.get_session()
+        print("db.get_session returned", type(session))
+        assert not isinstance(session, AsyncSession), "session is not an AsyncSession"
+        assert isinstance(session, AsyncGenerator), "session is not an AsyncGenerator"
+    finally:
+        # The new engine never made a connection, so a synchronous dispose is enough
+        if db.engine is not old_engine:
+            db.engine.sync_engine.dispose()
+        db.engine, db.async_sessionmaker, db.database_url = old_engine, old_sessionmaker, old_url
 
 
 if __name__ == '__main__':
@@ -8,19 +8,19 @@ Expected status codes for failed logins:
 """
 from fastapi import Response, status
 
-from fastapi.testclient import TestClient
+from httpx import AsyncClient
 import pytest
 from app.data_access import user_dao
 from app.routers.base import path
 # VS Code thinks these fixtures are unused, but they are used & necessary.
-from .fixtures import client, auth_user, session
+from .fixtures import async_client, auth_user, session
 from .utils import create_user
 
 # flake8: noqa: F811 Redefinition of import by parameter (fixtures)
 
 
 @pytest.mark.asyncio
-async def test_post_login(session, client: TestClient):
+async def test_post_login(session, async_client: AsyncClient):
     """User can login using POST request for url-formencoded data."""
     # Need a user with known password
     username = "Jose Hacker"
@@ -28,13 +28,13 @@ async def test_post_login(session, client: TestClient):
     password = "Sufficently*Strong?"
     user = await create_user(session, username, email, password)
     # Is user on server-side now?
-    response: Response = client.get(path(f"/users/{user.id}"))
+    response: Response = await async_client.get(path(f"/users/{user.id}"))
     assert response.status_code == status.HTTP_200_OK
     # Does user have a password?
     hashed_password = await user_dao.get_password(session, user.id)
     assert hashed_password is not None, f"User {user.email} has no password"
     # Can we login now?
-    response: Response = client.post(
+    response: Response = await async_client.post(
                         "/login",
                         data={"username": email, "password": password},
                         headers={"Content-Type": "application/x-www-form-urlencoded"}
@@ -48,7 +48,7 @@ async def test_post_login(session, client: TestClient):
 
 
 @pytest.mark.asyncio
-async def test_post_login_invalid_credentials(session, client: TestClient):
+async def test_post_login_invalid_credentials(session, async_client: AsyncClient):
     """Cannot login with invalid or missing password."""
     # Need a user with known password
     username = "Jose Hacker"
@@ -56,7 +56,7 @@ async def test_post_login_invalid_credentials(session, client: TestClient):
     password = "Sufficently*Strong?"
     user = await create_user(session, username, email, password)
     # Can we login without a password?
-    response: Response = client.post(
+    response: Response = await async_client.post(
                         "/login",
                         data={"username": email},
                         headers={"Content-Type": "application/x-www-form-urlencoded"}
@@ -64,7 +64,7 @@ async def test_post_login_invalid_credentials(session, client: TestClient):
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     # Try an incorrect or blank password
     bad_password = "FatChance!"
-    response: Response = client.post(
+    response: Response = await async_client.post(
                         "/login",
                         # data= specifies FORM data. Explictly setting header maybe not needed.
                         data={"username": email, "password": bad_password},
@@ -73,7 +73,7 @@ async def test_post_login_invalid_credentials(session, client: TestClient):
     assert response.status_code == status.HTTP_401_UNAUTHORIZED, f'using password "{bad_password}"'
     # What happens if password is empty?
     bad_password = ""
-    response: Response = client.post(
+    response: Response = await async_client.post(
                         "/login",
                         # data= specifies FORM data. Explictly setting header maybe not needed.
                         data={"username": email, "password": bad_password},
@@ -85,7 +85,7 @@ async def test_post_login_invalid_credentials(session, client: TestClient):
 
 
 @pytest.mark.asyncio
-async def test_json_login(session, client: TestClient):
+async def test_json_login(session, async_client: AsyncClient):
     """User can login using POST request and JSON form request body (hack, hack)."""
     # Need a user with known password
     username = "Jose Hacker"
@@ -94,7 +94,7 @@ async def test_json_login(session, client: TestClient):
     user = await create_user(session, username, email, password)
     # Use the REST API endpoint for login, not html form handler.
     url = path("/auth/login")
-    response: Response = client.post(
+    response: Response = await async_client.post(
                         url,
                         json={"username": email, "password": password}
                         )
@@ -105,7 +105,7 @@ async def test_json_login(session, client: TestClient):
 
 
 @pytest.mark.asyncio
-async def test_invalid_login(session, client: TestClient):
+async def test_invalid_login(session, async_client: AsyncClient):
     """User cannot authenticate via REST API with invalid username or password."""
     # Need a user with known password
     username = "Jose Hacker"
@@ -115,7 +115,7 @@ async def test_invalid_login(session, client: TestClient):
     # Try invalid username values
     login_url = path("/auth/login")
     for bad_username in ["unknown@nowhere.com", "jose", ""]:
-        response: Response = client.post(
+        response: Response = await async_client.post(
                         login_url,
                         json={"username": bad_username, "password": password}
                         )
@@ -126,20 +126,20 @@ async def test_invalid_login(session, client: TestClient):
             assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY, f"username = {bad_username}"
     # Try invalid password
     bad_password = "FatChance!"
-    response: Response = client.post(
+    response: Response = await async_client.post(
                         login_url,
                         json={"username": email, "password": bad_password}
                         )
     assert response.status_code == status.HTTP_401_UNAUTHORIZED, f'using password "{bad_password}"'
     # Empty password - should return 401
     ad_password = ""
-    response: Response = client.post(
+    response: Response = await async_client.post(
                         login_url,
                         json={"username": email, "password": bad_password}
                         )
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
     # Omit password entirely
-    response: Response = client.post(
+    response: Response = await async_client.post(
                         login_url,
                         json={"username": email}
                         )
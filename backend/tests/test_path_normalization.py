@@ -18,9 +18,9 @@ from .utils import auth_header, make_reading_values
 # flake8: noqa: F811 Parameter name shadows import
 
 
-@pytest.fixture()
+@pytest.fixture(scope="module")
 def client(): # -> Generator[fastapi.testclient.TestClient]
-    """Test Client instance the does NOT FOLLOW REDIRECTS."""
+    """Test Client instance the does NOT FOLLOW REDIRECTS, shared by tests in this module."""
     # main.app.dependency_overrides[get_session] = db.get_session
     yield TestClient(main.app, follow_redirects=False)
 
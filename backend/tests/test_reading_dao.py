@@ -4,8 +4,7 @@ import asyncio
 from datetime import datetime, timezone
 import logging
 import random
-from pydantic import ValidationError
-import pytest, pytest_asyncio
+import pytest
 from app import models, schemas
 from app.data_access import reading_dao as dao
 from .utils import as_utc_time
@@ -2,7 +2,6 @@
 
 import time
 from datetime import datetime, timezone
-from numbers import Number
 from urllib.parse import urlparse
 from fastapi import status
 from fastapi.testclient import TestClient
@@ -1,15 +1,21 @@
 """Unit tests of persistenc operations for models.User."""
-import asyncio
 from datetime import datetime
 import pytest, pytest_asyncio
+from sqlalchemy import bindparam, insert, select
 from sqlalchemy.exc import IntegrityError
 from app.models import User
-from .utils import as_utc_time, is_timezone_aware
+from .utils import as_utc_time, is_timezone_aware, persist
 # Import of session fixture is necessary
 from .fixtures import db, session
 
 # flake8: noqa: F811 Parameter name shadows import
 
+# Statements are created once, so SqlAlchemy's compiled statement cache is always hit.
+INSERT_USER = insert(User)
+# populate_existing reloads a user already in the session with the values in the database
+SELECT_USER_BY_EMAIL = (select(User).where(User.email == bindparam("email"))
+                        .execution_options(populate_existing=True))
+
 
 @pytest.fixture
 def user_data() -> dict:
@@ -23,38 +29,46 @@ def user_data() -> dict:
 @pytest_asyncio.fixture()
 async def user(session, user_data) -> User:
     """Inject a persisted user model into the session"""
-    user = User(**user_data)
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
-    return user
+    # RETURNING gets the new User with its id, created_at, updated_at. No refresh needed.
+    result = await session.execute(INSERT_USER.returning(User), [user_data])
+    return result.scalar_one()
 
 
 @pytest.mark.asyncio
 async def test_create_user(session, user_data: dict):
-    user = User(**user_data)
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
+    user = await persist(session, User(**user_data))
     assert user.id is not None
     assert user.username == user_data["username"]
     assert isinstance(user.created_at, datetime)
 
 
 @pytest.mark.asyncio
-async def test_create_and_update_dates(session, user):
-    """created_at and updated_at are automatically set and updated."""
-    assert isinstance(user.created_at, datetime), "user.created_at should be datetime but is {type(user.created_at).__name__}"
-    assert isinstance(user.updated_at, datetime), "user.created_at should be datetime but is {type(user.updated_at).__name__}"
-    # initially both dates should be nearly the same
+async def test_created_at_is_datetime(user):
+    """created_at is automatically set when a user is created."""
+    assert isinstance(user.created_at, datetime), \
+        f"user.created_at should be datetime but is {type(user.created_at).__name__}"
+
+
+@pytest.mark.asyncio
+async def test_updated_at_is_datetime(user):
+    """updated_at is automatically set when a user is created."""
+    assert isinstance(user.updated_at, datetime), \
+        f"user.updated_at should be datetime but is {type(user.updated_at).__name__}"
+
+
+@pytest.mark.asyncio
+async def test_created_equals_updated_on_insert(user):
+    """Initially created_at and updated_at should be nearly the same."""
     delta = user.updated_at - user.created_at
-    assert abs(delta.microseconds <= 500000)  # allow for imprecise timestamps
-    # update some attribute and retest create & update times
+    assert abs(delta.total_seconds()) <= 0.5  # allow for imprecise timestamps
+
+
+@pytest.mark.asyncio
+async def test_updated_at_advances_on_update(session, user):
+    """updated_at is automatically modified when a user is updated."""
     last_update = user.updated_at
     user.username = "Born again user"
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
+    await persist(session, user)
     new_update = user.updated_at
     assert as_utc_time(new_update) > as_utc_time(last_update), "user.updated_at not modified by update"
 
@@ -68,8 +82,9 @@ async def test_dates_are_timezone_aware(session, user):
     assert is_timezone_aware(user.updated_at), "user.updated_at is not timezone aware"
     # update the user and recheck `updated_at` is still timezone aware
     user.username = "Anonymous"
-    session.add(user)
-    await session.commit()
+    await persist(session, user)
+    # refresh is needed here so the dates are read from the database,
+    # not the client-side values assigned by the model defaults.
     await session.refresh(user)
     assert is_timezone_aware(user.updated_at), "after update, user.updated_at is not timezone-aware"
 
@@ -77,16 +92,11 @@ async def test_dates_are_timezone_aware(session, user):
 @pytest.mark.asyncio
 async def test_unique_email(session, user_data: dict):
     """User's email must be unique."""
-    user1 = User(**user_data)
-    session.add(user1)
-    await session.commit()
+    await session.execute(INSERT_USER, [user_data])
     # another user with same email
     user_data["username"] = "User 2. We try harder"
-    user2 = User(**user_data)
-    session.add(user2)
     with pytest.raises(IntegrityError):
-        await session.commit()
-        await session.rollback()
+        await session.execute(INSERT_USER, [user_data])
 
 
 @pytest.mark.asyncio
@@ -96,11 +106,10 @@ async def test_update_user_email(session, user):
     assert last_update is not None, "Create user did not set updated_at"
     new_email = "newemail@example.com"
     user.email = new_email
-    await asyncio.sleep(0.5)  # seconds, to ensure updated_at > last_update
-    session.add(user)
-    await session.commit()
-    updated_user = await session.get(User, user.id)
-    assert updated_user.email == new_email
+    await persist(session, user)
+    result = await session.execute(SELECT_USER_BY_EMAIL, {"email": new_email})
+    updated_user = result.scalar_one()
+    assert updated_user.id == user.id
     assert as_utc_time(updated_user.updated_at) > as_utc_time(last_update)
 
 
@@ -111,7 +120,7 @@ async def test_delete_user(session, user):
     assert user.id > 0
     user_id = user.id
     await session.delete(user)
-    await session.commit()
+    await session.flush()
     deleted_user = await session.get(User, user_id)
     assert deleted_user is None
 
@@ -1,55 +1,52 @@
 """Test the FastAPI routes for /user."""
 from fastapi import Response, status
 
-from fastapi.testclient import TestClient
-import pytest
-from app import models, schemas
+from httpx import AsyncClient, Headers
+import pytest, pytest_asyncio
+from app import models
+from app.core.database import db
 from app.data_access import user_dao
 from app.routers.base import path
-from app.utils import jwt
 # VS Code thinks these fixtures are unused, but they are used & necessary.
-from .fixtures import client, auth_user, session
+from .fixtures import async_client, auth_user, auth_headers, session
 # These are User entities for tests
 from .fixtures import alexa, sally
-from .utils import auth_header, create_users
+from .utils import auth_header, create_user, create_users
 
 # flake8: noqa: F811 Redefinition of import by parameter (fixtures)
 
 
 @pytest.mark.asyncio
-async def test_create_user(session, auth_user: models.User, client: TestClient):
+async def test_create_user(auth_headers: Headers, async_client: AsyncClient):
     """An authorized user can create a new user entity."""
     USER_EMAIL = "harry@hackers.com"
     USER_NAME = "Harry Hacker"
-    token = jwt.create_access_token(data={"user_id": auth_user.id}, expires=30)
-    result: Response = client.post(path("/users"),
-                         headers=auth_header(token),  # add authentication
+    result: Response = await async_client.post(path("/users"),
+                         headers=auth_headers,  # add authentication
                          json={"username": USER_NAME, "email": USER_EMAIL}
                         )
-    new_user = schemas.User(**result.json())
     assert result.status_code == status.HTTP_201_CREATED
-    assert new_user.email == USER_EMAIL
-    assert new_user.username == USER_NAME
-    # new user is in database, too
-    user = await user_dao.get_by_email(session, email=USER_EMAIL)
-    assert user is not None
-    assert user.username == USER_NAME
+    new_user = result.json()
+    assert new_user["email"] == USER_EMAIL
+    assert new_user["username"] == USER_NAME
+    # id is assigned by the database, so the new user was persisted
+    assert new_user["id"] > 0
     # cannot add another user with same email
-    result = client.post(path("/users"),
-                         headers=auth_header(token),
+    result = await async_client.post(path("/users"),
+                         headers=auth_headers,
                          json={"username": "Jone", "email": USER_EMAIL}
                         )
     # 409 CONFLICT is standard response for conflicting data
     assert result.status_code == status.HTTP_409_CONFLICT
 
 
-def test_create_user_returns_location(auth_user: models.User, client: TestClient):
+@pytest.mark.asyncio
+async def test_create_user_returns_location(auth_headers: Headers, async_client: AsyncClient):
     """Creating a new User should return a Location header with URL of the created resource."""
     USER_EMAIL = "harry@hackers.com"
     USER_NAME = "Harry Hacker"
-    token = jwt.create_access_token(data={"user_id": auth_user.id}, expires=30)
-    result: Response = client.post(path("/users"),
-                         headers=auth_header(token),  # add authentication
+    result: Response = await async_client.post(path("/users"),
+                         headers=auth_headers,  # add authentication
                          json={"username": USER_NAME, "email": USER_EMAIL}
                         )
     assert result.status_code == status.HTTP_201_CREATED
@@ -57,20 +54,21 @@ def test_create_user_returns_location(auth_user: models.User, client: TestClient
     location = result.headers.get("location", default=None)
     assert location is not None, "POST a new User should return 'location' header"
     # Get the URL.  Apparently its not necessary to strip off host part ("http://host:port")
-    get_response = client.get(location, headers=auth_header(auth_user))
+    get_response = await async_client.get(location, headers=auth_headers)
     assert get_response.status_code == status.HTTP_200_OK
     user_data = get_response.json()
     assert user_data["username"] == USER_NAME
     assert user_data["email"] == USER_EMAIL
 
 
-def test_get_user(alexa: models.User, auth_user: models.User, client: TestClient):
+@pytest.mark.asyncio
+async def test_get_user(alexa: models.User, auth_headers: Headers, async_client: AsyncClient):
     """Router returns a user with matching id, e.g. GET /users/1."""
     # add authentication?
     # the user to get
     user_id = alexa.id
-    result = client.get(path(f"/users/{user_id}"),
-                        headers=auth_header(auth_user))   # auth not really required
+    result = await async_client.get(path(f"/users/{user_id}"),
+                        headers=auth_headers)   # auth not really required
     assert result.status_code == status.HTTP_200_OK
     # verify user data from response body
     user_data = result.json()
@@ -80,67 +78,90 @@ def test_get_user(alexa: models.User, auth_user: models.User, client: TestClient
 
 
 @pytest.mark.asyncio
-async def test_get_users_returns_max(session, auth_user: models.User, client: TestClient):
-    """Router returns up to 100 users when no limit is specified."""
-    DEFAULT_LIMIT = 100
-    await create_users(session, 200)
-    result = client.get(path("/users/"), headers=auth_header(auth_user))
-    assert result.status_code == status.HTTP_200_OK
-    user_data = result.json()
-    assert isinstance(user_data, list)
-    assert len(user_data) == DEFAULT_LIMIT
+async def test_get_user_not_found(auth_headers: Headers, async_client: AsyncClient):
+    """Router returns 404 NOT FOUND for a user id that does not exist."""
+    result = await async_client.get(path("/users/99999"), headers=auth_headers)
+    assert result.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest_asyncio.fixture(scope="module")
+async def many_users(connection) -> list[int]:
+    """Create 200 users once for the tests of GET /users, and return their ids.
+
+       The users are created before the savepoint of each test, so all tests in this module see them.
+    """
+    async for session in db.get_session():
+        user_ids = await create_users(session, 200)
+    return user_ids
 
 
 @pytest.mark.asyncio
-async def test_get_users_with_limit(session, auth_user, client: TestClient):
-    """Router returns specified number of users when limit is provided."""
-    await create_users(session, 20)
-    result = client.get(path("/users/?limit=5"), headers=auth_header(auth_user))
+@pytest.mark.parametrize("query, expected_count", [
+    ("", 100),  # returns at most 100 users if no limit is specified
+    ("?limit=5", 5),
+    ])
+async def test_get_users(query: str, expected_count: int, many_users, auth_headers,
+                         async_client: AsyncClient):
+    """Router returns up to 100 users by default, or the number of users specified by limit."""
+    result = await async_client.get(path(f"/users/{query}"), headers=auth_headers)
     assert result.status_code == status.HTTP_200_OK
     users_data = result.json()
     assert isinstance(users_data, list)
-    assert len(users_data) == 5
+    assert len(users_data) == expected_count
 
 
 @pytest.mark.asyncio
-async def test_get_users_with_limit_and_offset(session, auth_user, client: TestClient):
+@pytest.mark.parametrize("offset", range(0, 50, 10))
+async def test_get_users_with_limit_and_offset(offset: int, session, many_users, auth_headers,
+                                               async_client: AsyncClient):
     """Router returns requested users when limit and offset are given."""
-    await create_users(session, 50)
-    my_auth_header = auth_header(auth_user)
-    # get users in groups of 10. Save the ids so we can verify no repeats.
-    seen_ids = []
-    for offset in range(0,50,10):
-        result = client.get(path(f"/users/?limit=10&offset={offset}"), headers=my_auth_header)
-        assert result.status_code == status.HTTP_200_OK
-        users_data = result.json()
-        assert isinstance(users_data, list)
-        assert len(users_data) == 10
-        returned_ids = {user["id"] for user in users_data}
-        # all the returned values are distinct
-        assert len(set(returned_ids)) == len(returned_ids), f"Duplicate returned User ids: {returned_ids}"
-        # none of them were returned previously
-        assert not any(id in seen_ids for id in returned_ids)
-        seen_ids.extend(returned_ids)
-
-    # If offset too large, then GET with offset returns an empty result
+    # Users are ordered by id, so each page must be a slice of all the ids.
+    # This also verifies that no user is repeated on different pages.
+    all_ids = [user.id for user in await user_dao.get_users(session)]
+    result = await async_client.get(path(f"/users/?limit=10&offset={offset}"), headers=auth_headers)
+    assert result.status_code == status.HTTP_200_OK
+    users_data = result.json()
+    assert isinstance(users_data, list)
+    assert len(users_data) == 10
+    returned_ids = [user["id"] for user in users_data]
+    assert returned_ids == all_ids[offset:offset+10]
+
+
+@pytest.mark.asyncio
+async def test_get_users_with_offset_too_large(many_users, auth_headers, async_client: AsyncClient):
+    """If offset is too large, then GET with offset returns an empty result."""
     offset = 1000
-    result = client.get(path(f"/users/?limit=10&offset={offset}"), headers=my_auth_header)
+    result = await async_client.get(path(f"/users/?limit=10&offset={offset}"), headers=auth_headers)
     assert result.status_code == status.HTTP_200_OK
     users_data = result.json()
     assert isinstance(users_data, list)
     assert len(users_data) == 0, f"Expected empty list but got {len(users_data)} results"
 
 
+@pytest.mark.asyncio
+async def test_get_users_same_as_get_user(session, auth_headers, async_client: AsyncClient):
+    """GET /users returns a user's data the same as GET /users/{id}, even if not normalized in database."""
+    user = await create_user(session, "Bob", "Bob@EXAMPLE.com")
+    result = await async_client.get(path(f"/users/{user.id}"), headers=auth_headers)
+    assert result.status_code == status.HTTP_200_OK
+    user_data = result.json()
+    # the new user has the largest id, so it is the last user
+    offset = len(await user_dao.get_users(session)) - 1
+    result = await async_client.get(path(f"/users/?offset={offset}"), headers=auth_headers)
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json() == [user_data]
+
+
 @pytest.mark.skip(reason="For debugging allow unauthenticated get all users")
 @pytest.mark.asyncio
-async def test_get_users_unauthenticated(session, client: TestClient):
+async def test_get_users_unauthenticated(many_users, async_client: AsyncClient):
     """Unauthenticated request to get all users should be forbidden."""
-    await create_users(session, 5)
-    result = client.get(path("/users/"))
+    result = await async_client.get(path("/users/"))
     assert result.status_code == status.HTTP_401_UNAUTHORIZED
 
 
-def test_update_user(alexa: models.User, sally: models.User, client: TestClient):
+@pytest.mark.asyncio
+async def test_update_user(alexa: models.User, sally: models.User, async_client: AsyncClient):
     """An authorized user can update his own data."""
     # the user to update
     user_id = alexa.id
@@ -149,7 +170,7 @@ def test_update_user(alexa: models.User, sally: models.User, client: TestClient)
                     "username": "Jeff Bezos",
                     "email": "bezos@amazon.com"
                   }
-    response = client.put(path(f"/users/{user_id}"),
+    response = await async_client.put(path(f"/users/{user_id}"),
                         # add authentication
                         headers=auth_header(alexa),
                         json=update_data
@@ -161,7 +182,8 @@ def test_update_user(alexa: models.User, sally: models.User, client: TestClient)
     assert updated["email"] == update_data["email"]
 
 
-def test_update_user_enforces_data_integrity(alexa: models.User, sally: models.User, client: TestClient):
+@pytest.mark.asyncio
+async def test_update_user_enforces_data_integrity(alexa: models.User, sally: models.User, async_client: AsyncClient):
     """Updates to a user cannot violate database constraints."""
     # the user to update
     user_id = alexa.id
@@ -170,7 +192,7 @@ def test_update_user_enforces_data_integrity(alexa: models.User, sally: models.U
                     "username": "Jeff Bezos",
                     "email": sally.email
                 }
-    response = client.put(path(f"/users/{user_id}"),
+    response = await async_client.put(path(f"/users/{user_id}"),
                         # add authentication
                         headers=auth_header(alexa),
                         json=update_data
@@ -179,40 +201,39 @@ def test_update_user_enforces_data_integrity(alexa: models.User, sally: models.U
     # TODO If a required field is missing, should raise HTTP 400
 
 
-def test_cannot_update_another_user(alexa, sally, client: TestClient):
+@pytest.mark.asyncio
+async def test_cannot_update_another_user(alexa, sally, async_client: AsyncClient):
     """A user may update only his/her own data, not someone else's."""
     update_data = {
                     "username": "Jeff Bezos",
                     "email": "bezos@amazon.com"
                 }
-    response = client.put(path(f"/users/{alexa.id}"),  # the user to update
+    response = await async_client.put(path(f"/users/{alexa.id}"),  # the user to update
                           headers=auth_header(sally),  # authenticate as someone else
                           json=update_data
                           )
     assert response.status_code == status.HTTP_403_FORBIDDEN
 
 
-def test_delete_user(alexa: models.User, auth_user: models.User, client: TestClient):
+@pytest.mark.asyncio
+async def test_delete_user(session, alexa: models.User, auth_headers: Headers, async_client: AsyncClient):
     """An authorized user can delete a user. For now, any authenticated user is authorized."""
     # the user to delete
     user_id = alexa.id
-    result = client.delete(path(f"/users/{user_id}"), headers=auth_header(auth_user))
+    result = await async_client.delete(path(f"/users/{user_id}"), headers=auth_headers)
     # Should return HTTP 204
     assert result.status_code == status.HTTP_204_NO_CONTENT
-    # user should no longer be fetchable
-    token = jwt.create_access_token(data={"user_id": auth_user.id}, expires=30)
-    result = client.get(f"/users/{user_id}", headers=auth_header(auth_user))
-    # Should return NOT FOUND
-    assert result.status_code == status.HTTP_404_NOT_FOUND, \
-          f"GET deleted user {user_id} returned status code {result.status_code}"
+    # user is no longer in persistent storage. GET of a missing user is tested by test_get_user_not_found
+    user = await user_dao.get(session, user_id)
+    assert user is None, f"Deleted user {user_id} is still in the database"
 
 
 @pytest.mark.asyncio
-async def test_unauthenticated_delete_user(session, sally, auth_user, client: TestClient):
+async def test_unauthenticated_delete_user(session, sally, auth_headers, async_client: AsyncClient):
     """An unauthorized request cannot delete a user."""
     # injected user to delete
     user_id = sally.id
-    result = client.delete(path(f"/users/{user_id}"))
+    result = await async_client.delete(path(f"/users/{user_id}"))
     # Should be either FORBIDDEN or UNAUTHORIZED
     assert result.status_code == status.HTTP_401_UNAUTHORIZED
     # user is still in persistent storage
@@ -220,5 +241,5 @@ async def test_unauthenticated_delete_user(session, sally, auth_user, client: Te
     assert user is not None, f"Unauthorized delete request deleted user {str(sally)}"
     assert user.id == user_id, f"Unauthorized delete request changed user id of {str(sally)}"
     # user should still be GET-able
-    result = client.get(path(f"/users/{user_id}"), headers=auth_header(auth_user))
+    result = await async_client.get(path(f"/users/{user_id}"), headers=auth_headers)
     assert result.status_code == status.HTTP_200_OK
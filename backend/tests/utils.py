@@ -1,23 +1,55 @@
 """Some utility functions for use in tests."""
-from datetime import datetime, timezone
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from numbers import Number
+import random
+from types import MappingProxyType
+from sqlalchemy import insert
 from app import models
 from app.core import security
 from app.utils import jwt
 
 # Email domain for users created by create_users()
 EMAIL_DOMAIN = "test.doma.in"
+# (username, email) of users created by create_users() with the default email domain
+_USER_NAMES = tuple((f"User{n}", f"user{n}@{EMAIL_DOMAIN}") for n in range(1, 1001))
 
+# Minutes until an access token created by auth_header expires
+TOKEN_EXPIRES = 30
+# Access tokens created by auth_header and their expiry time, keyed by user id.
+# A token contains only the user id, so it can be reused until it expires.
+_tokens: dict[int, tuple[str, datetime]] = {}
 
-def auth_header(arg: models.User | str) -> dict:
+
+def auth_header(arg: models.User | str) -> Mapping[str, str]:
     """Create an auth token for a user (if arg is User model) or containing arg (str)
        as a token, and return an authorization header containing the token.
+
+       Tokens for a User are created once per user id and reused in later calls.
+       The header is a read-only mapping, shared by all calls with the same token.
     """
     if isinstance(arg, models.User):
-        token = jwt.create_access_token(data={"user_id": arg.id}, expires=30)
+        token = _token_for(arg.id)
     else:
         token = arg  # assume string is a token
-    return {"Authorization": f"Bearer {token}"}
+    return _bearer_header(token)
+
+
+def _token_for(user_id: int) -> str:
+    """Return a cached access token for a user id, or create a new one if it will soon expire."""
+    now = datetime.now(timezone.utc)
+    token, expires = _tokens.get(user_id, ("", now))
+    if expires - now < timedelta(minutes=1):
+        token = jwt.create_access_token(data={"user_id": user_id}, expires=TOKEN_EXPIRES)
+        _tokens[user_id] = (token, now + timedelta(minutes=TOKEN_EXPIRES))
+    return token
+
+
+@lru_cache(maxsize=16)
+def _bearer_header(token: str) -> Mapping[str, str]:
+    """Return a read-only authorization header for a token."""
+    return MappingProxyType({"Authorization": f"Bearer {token}"})
 
 
 def is_timezone_aware(dt: datetime) -> bool:
@@ -34,34 +66,50 @@ def as_utc_time(dt: datetime) -> datetime:
     return dt.replace(tzinfo=timezone.utc)
 
 
+# Alphabet of each character in a password created by make_password().
+# 3 repetitions of lowercase, uppercase, digit, special character gives a 12 character password.
+_PASSWORD_ALPHABETS = ("abcdefghijklmnopqrstuvwxyz", "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+                       "0123456789", "!@#$%^&*+-.") * 3
+
+
 def make_password() -> str:
     """Make a random password that will probably pass password validation.
 
+    The password has 3 each of lowercase, uppercase, digit, and special characters.
     The custom validator rules are in app.schemas.PasswordStr.
     """
-    from random import randint
-    LOWERCASE = "abcdefghijklmnopqrstuvwxyz"
-    UPPERCASE = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    SPECIALS = "!@#$%^&*+-."
-    min_length = 12
-    password: str = ""
-    while len(password) < min_length:
-        password += LOWERCASE[randint(0, 25)]
-        password += UPPERCASE[randint(0, 25)]
-        password += str(randint(0, 9))
-        password += SPECIALS[randint(0, len(SPECIALS)-1)]  # noqa: E226
-    return password
-
-
-async def create_users(session, howmany: int, email_domain: str = EMAIL_DOMAIN):
-    """Create multiple users.  Assumes database and User table already initialized."""
-    # TODO: Use same Session as the test method, or a separate Session?
-    for n in range(1, howmany + 1):
-        username = f"User{n}"
-        email = f"{username.lower()}@{email_domain}"
-        session.add(models.User(username=username, email=email))
+    return "".join([random.choice(alphabet) for alphabet in _PASSWORD_ALPHABETS])
+
+
+async def persist(session, obj):
+    """Add a model object to the session and flush it to the database, without a commit.
+
+    Flush assigns the id and default values. Use this in tests that only need the
+    object in the database for the current session, not in another session or request.
+    :returns: the model object
+    """
+    session.add(obj)
+    await session.flush()
+    return obj
+
+
+async def create_users(session, howmany: int, email_domain: str = EMAIL_DOMAIN) -> list[int]:
+    """Create multiple users.  Assumes database and User table already initialized.
+
+    Users are added in one bulk INSERT ... RETURNING statement,
+    which SqlAlchemy sends as a few multi-row INSERTs ("insertmanyvalues").
+    :returns: list of id of the new users, in order of creation
+    """
+    if email_domain == EMAIL_DOMAIN and howmany <= len(_USER_NAMES):
+        names = _USER_NAMES[:howmany]
+    else:
+        names = [(f"User{n}", f"user{n}@{email_domain}") for n in range(1, howmany + 1)]
+    rows = [{"username": username, "email": email} for username, email in names]
+    statement = insert(models.User).returning(models.User.id, sort_by_parameter_order=True)
+    result = await session.execute(statement, rows)
+    ids = list(result.scalars())
     await session.commit()
-    print(f"Added {n} users")
+    return ids
 
 
 async def create_user(session, username: str, email: str, password: str = None):
@@ -77,8 +125,7 @@ async def create_user(session, username: str, email: str, password: str = None):
     if password:
         user_pass = models.UserPassword(
                             user_id=user.id,
-                            hashed_password=security.hash_password(password),
-                            updated_at=datetime.now(timezone.utc)
+                            hashed_password=security.hash_password(password)
                             )  # noqa: E124
         session.add(user_pass)
         await session.commit()